@@ -0,0 +1,140 @@
+import numpy as np
+import pandas as pd
+from pandas import DataFrame
+
+
+def load_observations(raw_file: str) -> DataFrame:
+    """Lê as observações brutas salvas pelo scrapper.
+
+    Args:
+        raw_file (str): arquivo csv com as observações brutas.
+
+    Returns:
+        DataFrame: uma linha por carta buscada.
+    """
+    return pd.read_csv(raw_file, sep=";")
+
+
+def get_latest_observations(cards_df: DataFrame) -> DataFrame:
+    """Mantém apenas a observação mais recente de cada carta.
+    O arquivo bruto acumula as buscas de todas as execuções, então sem esse filtro a
+    mesma carta seria comparada com os seus próprios preços antigos. Observações sem
+    scraped_at (de versões anteriores) são consideradas as mais antigas.
+
+    Args:
+        cards_df (DataFrame): observações brutas. Veja load_observations.
+
+    Returns:
+        DataFrame: uma linha por carta, na ordem em que as cartas foram buscadas.
+    """
+    cards_df = cards_df.copy()
+    if "scraped_at" not in cards_df.columns:
+        cards_df["scraped_at"] = None
+    cards_df["scraped_at"] = pd.to_datetime(cards_df["scraped_at"])
+    return (
+        cards_df.sort_values("scraped_at", kind="stable", na_position="first")
+        .drop_duplicates("card_name", keep="last")
+        .sort_index()
+        .reset_index(drop=True)
+    )
+
+
+def compute_card_metrics(cards_df: DataFrame, stores_df: DataFrame) -> DataFrame:
+    """Calcula as métricas de todas as cartas de uma vez só.
+    Valores infinitos (cartas sem preço na Liga Magic ou sem oferta válida na loja) e
+    valores zerados nos preços de referência viram NaN, assim as métricas dessas cartas
+    ficam vazias em vez de infinitas. Cartas que não foram achadas em nenhuma loja também
+    ficam sem valor na loja.
+
+    Métricas calculadas:
+        - store_discount: desconto da loja em fração (5% vira 0.05).
+        - discounted_store_value: valor na loja já com o desconto.
+        - premium_discount_on_min_value: ágio/deságio do valor na loja em relação ao valor mínimo.
+        - premium_discount_on_avg_value: ágio/deságio do valor na loja em relação ao valor médio.
+        - discounted_premium_on_min_value: ágio/deságio do valor com desconto em relação ao valor mínimo.
+        - premium_rank: posição da carta ordenada pelo ágio em relação ao valor mínimo (1 é a melhor oferta).
+
+    Args:
+        cards_df (DataFrame): observações brutas. Veja load_observations.
+        stores_df (DataFrame): lojas do usuário com as colunas name e discount.
+
+    Returns:
+        DataFrame: observações com as métricas.
+    """
+    cards_df = cards_df.copy()
+    # Quando nenhuma carta foi achada em loja, o read_csv carrega store_name como float.
+    cards_df["store_name"] = cards_df["store_name"].astype("string")
+    for column in ("min_value", "avg_value", "store_value"):
+        cards_df[column] = pd.to_numeric(cards_df[column], errors="coerce").replace(
+            [np.inf, -np.inf], np.nan
+        )
+    cards_df.loc[cards_df["store_name"].isna(), "store_value"] = np.nan
+    min_value = cards_df["min_value"].where(cards_df["min_value"] > 0)
+    avg_value = cards_df["avg_value"].where(cards_df["avg_value"] > 0)
+
+    discounts = (
+        stores_df.assign(name=stores_df["name"].str.upper())
+        .drop_duplicates("name")
+        .set_index("name")["discount"]
+    )
+    cards_df["store_discount"] = (
+        cards_df["store_name"].str.upper().map(discounts).astype(float).fillna(0) / 100
+    )
+    cards_df["discounted_store_value"] = cards_df["store_value"] * (
+        1 - cards_df["store_discount"]
+    )
+
+    cards_df["premium_discount_on_min_value"] = cards_df["store_value"] / min_value - 1
+    cards_df["premium_discount_on_avg_value"] = cards_df["store_value"] / avg_value - 1
+    cards_df["discounted_premium_on_min_value"] = (
+        cards_df["discounted_store_value"] / min_value - 1
+    )
+    cards_df["premium_rank"] = (
+        cards_df["premium_discount_on_min_value"].rank(method="min").astype("Int64")
+    )
+    return cards_df
+
+
+def get_store_summary(cards_df: DataFrame) -> DataFrame:
+    """Resume as métricas por loja. Cartas não encontradas em nenhuma loja são ignoradas.
+
+    Args:
+        cards_df (DataFrame): observações com as métricas. Veja compute_card_metrics.
+
+    Returns:
+        DataFrame: uma linha por loja, ordenado pelo ágio médio em relação ao valor mínimo.
+    """
+    found_cards_df = cards_df[cards_df["store_value"].notna()]
+    return (
+        found_cards_df.groupby("store_name")
+        .agg(
+            cards_found=("card_name", "count"),
+            total_stock=("stock", "sum"),
+            total_store_value=("store_value", "sum"),
+            total_discounted_store_value=("discounted_store_value", "sum"),
+            mean_premium_on_min_value=("premium_discount_on_min_value", "mean"),
+            mean_premium_on_avg_value=("premium_discount_on_avg_value", "mean"),
+            median_premium_on_min_value=("premium_discount_on_min_value", "median"),
+        )
+        .sort_values("mean_premium_on_min_value")
+        .reset_index()
+    )
+
+
+def build_report(
+    raw_file: str, stores_df: DataFrame, output_file: str, summary_file: str
+) -> None:
+    """Gera os relatórios a partir da observação mais recente de cada carta, sem precisar
+    rodar o scrapper de novo.
+
+    Args:
+        raw_file (str): arquivo csv com as observações brutas.
+        stores_df (DataFrame): lojas do usuário com as colunas name e discount.
+        output_file (str): arquivo csv com as métricas por carta.
+        summary_file (str): arquivo csv com as métricas por loja.
+    """
+    cards_df = compute_card_metrics(
+        get_latest_observations(load_observations(raw_file)), stores_df
+    )
+    cards_df.to_csv(output_file, sep=";", index=False)
+    get_store_summary(cards_df).to_csv(summary_file, sep=";", index=False)
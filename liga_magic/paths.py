@@ -0,0 +1,5 @@
+# Caminhos usados pelo scrapper (main.py) e pelo gerador de relatórios (report.py).
+INPUTS = "assets/inputs/"
+RAW_OUTPUT_FILE = "assets/outputs/raw_cards.csv"
+OUTPUT_FILE = "assets/outputs/cards.csv"
+STORES_SUMMARY_FILE = "assets/outputs/stores_summary.csv"
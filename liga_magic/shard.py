@@ -0,0 +1,103 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import Manager
+import pandas as pd
+
+
+def split_cards(cards: list[str], num_shards: int) -> list[list[str]]:
+    """Divide a lista de cartas em shards de forma determinística.
+    A carta na posição i vai para o shard i % num_shards, então a mesma lista
+    sempre gera os mesmos shards e o tamanho deles difere em no máximo uma carta.
+
+    Args:
+        cards (list[str]): lista com o nome das cartas.
+        num_shards (int): quantidade de shards.
+
+    Returns:
+        list[list[str]]: lista de shards. Shards vazios são descartados.
+    """
+    if num_shards < 1:
+        raise ValueError("num_shards deve ser maior que zero. Valor encontrado: %s" % num_shards)
+    shards = [cards[shard::num_shards] for shard in range(num_shards)]
+    return [shard for shard in shards if len(shard) > 0]
+
+
+def get_part_file(output_file: str, shard: int) -> str:
+    """Retorna o nome do arquivo parcial de um shard.
+
+    Args:
+        output_file (str): arquivo final. Exemplo: assets/outputs/cards.csv
+        shard (int): número do shard.
+
+    Returns:
+        str: arquivo parcial. Exemplo: assets/outputs/cards.part0.csv
+    """
+    root, ext = os.path.splitext(output_file)
+    return f"{root}.part{shard}{ext}"
+
+
+def merge_part_files(part_files: list[str], output_file: str) -> None:
+    """Junta os arquivos parciais dos shards no arquivo final.
+    Linhas já existentes no arquivo final são mantidas. O resultado é escrito num
+    arquivo temporário e só então substitui o arquivo final, assim uma falha no meio
+    da escrita não corrompe o que já foi extraído. Os arquivos parciais são removidos ao final.
+
+    Args:
+        part_files (list[str]): arquivos parciais na ordem dos shards.
+        output_file (str): arquivo final.
+    """
+    files = [output_file] if os.path.exists(output_file) else []
+    files += [part_file for part_file in part_files if os.path.exists(part_file)]
+    if len(files) == 0:
+        return
+
+    cards_df = pd.concat(
+        [pd.read_csv(file, sep=";") for file in files], ignore_index=True
+    )
+    tmp_file = output_file + ".tmp"
+    cards_df.to_csv(tmp_file, sep=";", index=False)
+    os.replace(tmp_file, output_file)
+
+    for part_file in part_files:
+        if os.path.exists(part_file):
+            os.remove(part_file)
+
+
+def run_shards(scrape, cards: list[str], num_shards: int, output_file: str) -> None:
+    """Divide a lista de cartas em shards e roda cada um num processo separado, com o seu
+    próprio arquivo parcial. Ao final junta os arquivos parciais em output_file.
+    Se algum shard falhar, os outros rodam até o fim, o que já foi extraído é salvo e o
+    erro é relançado.
+
+    Os processos recebem um dict e um lock compartilhados, usados para guardar o estado do
+    limitador de requisições (veja liga_magic.throttle.HostRateLimiter). Assim, quando um
+    processo reduz a taxa de um site, todos os outros também passam a respeitar a nova taxa.
+
+    Args:
+        scrape: função chamada como scrape(cards, part_file, limiter_state, limiter_lock)
+            em cada processo.
+        cards (list[str]): lista com o nome das cartas.
+        num_shards (int): quantidade de processos.
+        output_file (str): arquivo final.
+    """
+    shards = split_cards(cards, num_shards)
+    part_files = [get_part_file(output_file, shard) for shard in range(len(shards))]
+    # Remove arquivos parciais de execuções interrompidas para não duplicar cartas.
+    for part_file in part_files:
+        if os.path.exists(part_file):
+            os.remove(part_file)
+
+    try:
+        with Manager() as manager, ProcessPoolExecutor(max_workers=len(shards)) as executor:
+            limiter_state = manager.dict()
+            limiter_lock = manager.Lock()
+            futures = [
+                executor.submit(scrape, shard_cards, part_file, limiter_state, limiter_lock)
+                for shard_cards, part_file in zip(shards, part_files)
+            ]
+        # Só junta depois que todos os processos terminaram, para não apagar arquivos
+        # parciais que ainda estão sendo escritos.
+        for future in futures:
+            future.result()
+    finally:
+        merge_part_files(part_files, output_file)
@@ -0,0 +1,233 @@
+import logging
+import threading
+import time
+from urllib.parse import urlparse
+from seleniumbase import Driver
+
+
+# Trechos do título de páginas de bloqueio (429, captcha e desafios anti-bot).
+# Números soltos como "429" ficam de fora, pois aparecem em títulos normais (coleção, id do item).
+BLOCKED_PAGE_TITLES = (
+    "too many requests",
+    "just a moment",
+    "attention required",
+    "access denied",
+    "captcha",
+)
+
+
+class TokenBucket:
+    """Token bucket com taxa adaptativa (aumento aditivo, redução multiplicativa).
+    A taxa cai pela metade sempre que o servidor dá sinais de sobrecarga e volta a subir
+    aos poucos, até max_rate, enquanto as respostas estiverem saudáveis.
+
+    O estado do bucket (taxa, tokens e pausa) fica em state[key]. Passando um dict e um
+    lock de um multiprocessing.Manager, vários processos dividem o mesmo bucket: uma
+    penalidade registrada por um processo vale para todos.
+
+    Args:
+        max_rate (float): máximo de requisições por segundo.
+        min_rate (float): mínimo de requisições por segundo. Padrão: max_rate / 16.
+        capacity (float): quantas requisições podem ser feitas em rajada. Padrão: 1.
+        increase (float): quanto a taxa sobe a cada resposta saudável. Padrão: max_rate / 10.
+        backoff (float): fator que multiplica a taxa a cada sinal de sobrecarga. Padrão: 0.5.
+        clock: função que retorna o tempo atual em segundos.
+        sleep: função usada para esperar.
+        state (dict): onde o estado do bucket é guardado. Padrão: um dict novo.
+        key (str): chave do bucket em state.
+        lock: lock que protege state. Padrão: um threading.Lock novo.
+    """
+
+    def __init__(
+        self,
+        max_rate: float,
+        min_rate: float = None,
+        capacity: float = 1,
+        increase: float = None,
+        backoff: float = 0.5,
+        clock=time.monotonic,
+        sleep=time.sleep,
+        state: dict = None,
+        key: str = "",
+        lock=None,
+    ):
+        if max_rate <= 0:
+            raise ValueError("max_rate deve ser maior que zero. Valor encontrado: %s" % max_rate)
+        self.max_rate = max_rate
+        self.min_rate = min_rate if min_rate is not None else max_rate / 16
+        self.capacity = capacity
+        self.increase = increase if increase is not None else max_rate / 10
+        self.backoff = backoff
+        self._clock = clock
+        self._sleep = sleep
+        self._state = state if state is not None else {}
+        self._key = key
+        self._lock = lock if lock is not None else threading.Lock()
+        with self._lock:
+            if key not in self._state:
+                # (taxa, tokens, última atualização, pausado até)
+                self._state[key] = (max_rate, capacity, clock(), 0)
+
+    def _load(self) -> tuple[float, float, float]:
+        """Lê o estado e repõe os tokens acumulados desde a última atualização. Chamar com o lock."""
+        rate, tokens, updated_at, paused_until = self._state[self._key]
+        now = self._clock()
+        tokens = min(self.capacity, tokens + (now - updated_at) * rate)
+        return rate, tokens, paused_until
+
+    def _save(self, rate: float, tokens: float, paused_until: float) -> None:
+        self._state[self._key] = (rate, tokens, self._clock(), paused_until)
+
+    @property
+    def rate(self) -> float:
+        """Taxa atual em requisições por segundo."""
+        return self._state[self._key][0]
+
+    @property
+    def paused_until(self) -> float:
+        """Instante, no relógio de clock, até quando as requisições estão pausadas."""
+        return self._state[self._key][3]
+
+    def acquire(self) -> None:
+        """Espera até existir um token disponível e o consome."""
+        while True:
+            with self._lock:
+                rate, tokens, paused_until = self._load()
+                wait = paused_until - self._clock()
+                if wait <= 0:
+                    if tokens >= 1:
+                        self._save(rate, tokens - 1, paused_until)
+                        return
+                    wait = (1 - tokens) / rate
+            self._sleep(wait)
+
+    def penalize(self, pause: float = 0) -> None:
+        """Reduz a taxa após um sinal de sobrecarga.
+
+        Args:
+            pause (float): segundos sem nenhuma requisição, além da redução da taxa.
+        """
+        with self._lock:
+            rate, tokens, paused_until = self._load()
+            self._save(
+                max(self.min_rate, rate * self.backoff),
+                min(tokens, 0),
+                max(paused_until, self._clock() + pause),
+            )
+
+    def reward(self) -> None:
+        """Aumenta a taxa após uma resposta saudável."""
+        with self._lock:
+            rate, tokens, paused_until = self._load()
+            self._save(min(self.max_rate, rate + self.increase), tokens, paused_until)
+
+
+class HostRateLimiter:
+    """Mantém um TokenBucket por host (www.ligamagic.com.br e o domínio de cada loja).
+    Para dividir os buckets entre processos, passe o mesmo state e lock (criados por um
+    multiprocessing.Manager) para o HostRateLimiter de cada processo.
+
+    Args:
+        max_rate (float): máximo de requisições por segundo em cada host.
+        slow_response (float): respostas mais lentas que isso, em segundos, reduzem a taxa.
+        blocked_pause (float): segundos de pausa no host após uma página de bloqueio.
+        state (dict): onde o estado dos buckets é guardado, com o host como chave.
+        lock: lock que protege state.
+        **bucket_kwargs: demais argumentos repassados para cada TokenBucket.
+    """
+
+    def __init__(
+        self,
+        max_rate: float,
+        slow_response: float = 10,
+        blocked_pause: float = 30,
+        state: dict = None,
+        lock=None,
+        **bucket_kwargs,
+    ):
+        self.max_rate = max_rate
+        self.slow_response = slow_response
+        self.blocked_pause = blocked_pause
+        self._state = state if state is not None else {}
+        self._state_lock = lock if lock is not None else threading.Lock()
+        self._bucket_kwargs = bucket_kwargs
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def get_bucket(self, url: str) -> TokenBucket:
+        """Retorna o TokenBucket do host da url, criando um novo se necessário."""
+        host = urlparse(url).netloc.lower()
+        with self._lock:
+            if host not in self._buckets:
+                self._buckets[host] = TokenBucket(
+                    self.max_rate,
+                    state=self._state,
+                    key=host,
+                    lock=self._state_lock,
+                    **self._bucket_kwargs,
+                )
+            return self._buckets[host]
+
+    def acquire(self, url: str) -> None:
+        """Espera a vez de fazer uma requisição para o host da url."""
+        self.get_bucket(url).acquire()
+
+    def report(self, url: str, elapsed: float, blocked: bool = False) -> None:
+        """Ajusta a taxa do host de acordo com a resposta recebida.
+
+        Args:
+            url (str): url requisitada.
+            elapsed (float): tempo da resposta em segundos.
+            blocked (bool): se a resposta foi uma página de bloqueio.
+        """
+        bucket = self.get_bucket(url)
+        if blocked:
+            logging.warning(f"Página de bloqueio em {url}. Reduzindo a taxa de requisições.")
+            bucket.penalize(self.blocked_pause)
+        elif elapsed > self.slow_response:
+            logging.info(f"Resposta lenta ({elapsed:.1f}s) em {url}. Reduzindo a taxa de requisições.")
+            bucket.penalize()
+        else:
+            bucket.reward()
+
+
+def is_blocked_page(title: str) -> bool:
+    """Verifica se o título da página indica bloqueio (429, captcha ou desafio anti-bot).
+    O Selenium não expõe o status HTTP, então o título é o sinal mais confiável disponível.
+
+    Args:
+        title (str): título da página.
+
+    Returns:
+        bool: True se a página for de bloqueio.
+    """
+    title = (title or "").lower()
+    return any(blocked_title in title for blocked_title in BLOCKED_PAGE_TITLES)
+
+
+def throttled_get(
+    driver: Driver, limiter: HostRateLimiter, url: str, max_retries: int = 3
+) -> None:
+    """Abre a url respeitando a taxa do host e ajusta a taxa de acordo com a resposta.
+    Se cair numa página de bloqueio, espera e tenta de novo até max_retries vezes.
+
+    Args:
+        driver (Driver): driver Selenium.
+        limiter (HostRateLimiter): limitador compartilhado entre as requisições.
+        url (str): url a ser aberta.
+        max_retries (int): quantidade de novas tentativas após uma página de bloqueio.
+
+    Raises:
+        ValueError: se a página continuar bloqueada após todas as tentativas.
+    """
+    for _ in range(max_retries + 1):
+        limiter.acquire(url)
+        start = time.monotonic()
+        driver.get(url)
+        blocked = is_blocked_page(driver.title)
+        limiter.report(url, time.monotonic() - start, blocked)
+        if not blocked:
+            return
+    raise ValueError(
+        "Página de bloqueio em %s após %s novas tentativas." % (url, max_retries)
+    )
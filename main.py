@@ -2,14 +2,18 @@ import re
 import os
 import logging
 from time import sleep
+from datetime import datetime
 from dotenv import load_dotenv
-import numpy as np
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.support.ui import WebDriverWait
 import pandas as pd
 from pandas import DataFrame
 import liga_magic.webpage as wp
+from liga_magic.shard import run_shards
+from liga_magic.analytics import build_report
+from liga_magic.throttle import HostRateLimiter, throttled_get
+from liga_magic.paths import INPUTS, RAW_OUTPUT_FILE, OUTPUT_FILE, STORES_SUMMARY_FILE
 
 
 def get_cards(card_list_file: str) -> list[str]:
@@ -39,10 +43,11 @@ def get_card_dataframe(
     card_quality: str = None,
     stock: int = 0,
     cheaper_cards_amount: int = 0,
-    store_value: float = 0,
-    premium_discount_on_min_value: float = 0,
-    premium_discount_on_avg_value: float = 0,
+    store_value: float = None,
 ) -> DataFrame:
+    """Monta a observação bruta de uma carta. As métricas são calculadas depois por
+    liga_magic.analytics, sem precisar rodar o scrapper de novo. A coluna scraped_at
+    guarda quando a carta foi buscada, para os relatórios usarem só a busca mais recente."""
     cartas_web_dic = [
         {
             "card_name": legible_card_name,
@@ -53,8 +58,7 @@ def get_card_dataframe(
             "min_value": min_card_value,
             "avg_value": avg_card_value,
             "store_value": store_value,
-            "premium_discount_on_min_value": premium_discount_on_min_value,
-            "premium_discount_on_avg_value": premium_discount_on_avg_value,
+            "scraped_at": datetime.now().isoformat(timespec="seconds"),
         }
     ]
     return pd.DataFrame().from_dict(cartas_web_dic)
@@ -62,8 +66,6 @@ def get_card_dataframe(
 
 logging.basicConfig(level=logging.INFO)
 load_dotenv()
-INPUTS = "assets/inputs/"
-OUTPUT_FILE = "assets/outputs/cards.csv"
 USER_ACCEPTED_LANGUAGES = os.getenv("ACCEPTED_LANGUAGES").upper().split(",")
 
 # Se a variável MAXIMUM_CARD_PRICE não for configurada, coloca um valor alto para comparações.
@@ -72,6 +74,19 @@ if os.getenv("MAXIMUM_CARD_PRICE") is not None:
 else:
     MAXIMUM_CARD_PRICE = float("inf")
 
+# Quantidade de processos para rodar em paralelo. Cada processo abre o seu próprio Chrome.
+NUM_SHARDS = int(os.getenv("NUM_SHARDS", "1"))
+if NUM_SHARDS < 1:
+    raise ValueError("NUM_SHARDS deve ser maior que zero. Valor encontrado: %s" % NUM_SHARDS)
+
+# Máximo de requisições por segundo em cada site, somando todos os processos.
+# A taxa é reduzida automaticamente quando o site responde devagar ou com páginas de bloqueio.
+REQUESTS_PER_SECOND = float(os.getenv("REQUESTS_PER_SECOND", "0.5"))
+if REQUESTS_PER_SECOND <= 0:
+    raise ValueError(
+        "REQUESTS_PER_SECOND deve ser maior que zero. Valor encontrado: %s" % REQUESTS_PER_SECOND
+    )
+
 
 user_stores = pd.read_csv(INPUTS + "stores.csv", sep=";")
 user_stores["name"] = user_stores["name"].str.upper()
@@ -81,205 +96,238 @@ USER_CARD_QUALITY_CODE = wp.get_card_quality(
     card_quality=os.getenv("MINIMAL_CARD_QUALITY").upper()
 )
 
-driver = wp.get_driver_instance()
-is_the_cookie_removed = False
-
-# Loop para pegar informação de cada card.
-for card_name in get_cards(INPUTS + "cardlist.txt"):
-    legible_card_name = card_name.replace(",", " ").replace("\n", "")
-    card_url = card_name.replace(" ", "+")
-    driver.get(f"https://www.ligamagic.com.br/?view=cards/card&card={card_url}")
+def scrape_cards(
+    cards: list[str], output_file: str, limiter_state: dict = None, limiter_lock=None
+) -> None:
+    """Busca cada carta da lista na Liga Magic e nas lojas de interesse, salvando o resultado em output_file.
+    Cada chamada usa a sua própria instância do Chrome, então pode rodar em paralelo em processos separados.
 
-    min_card_value, avg_card_value = wp.get_lm_min_avg_card_value(driver)
-    #min_card_value = wp.get_lm_card_value(driver, "MIN")
-    #avg_card_value = wp.get_lm_card_value(driver, "AVG")
-
-    # Carta está mais cara do que estou disposto a pagar, então não procuro valores.
-    if min_card_value > MAXIMUM_CARD_PRICE:
-        cartas_web_df = get_card_dataframe(
-            legible_card_name, min_card_value, avg_card_value
-        )
-        logging.info(f"Carta {card_name} está muito cara! Está custando {min_card_value}")
-        cartas_web_df.to_csv(
-            OUTPUT_FILE,
-            sep=";",
-            mode="a",
-            header=not os.path.exists(OUTPUT_FILE),
-            index=False,
+    Args:
+        cards (list[str]): lista com o nome das cartas.
+        output_file (str): arquivo csv onde as cartas são salvas.
+        limiter_state (dict): estado do limitador de requisições compartilhado entre os
+            processos. Veja liga_magic.shard.run_shards.
+        limiter_lock: lock que protege limiter_state.
+    """
+    driver = wp.get_driver_instance()
+    limiter = HostRateLimiter(
+        REQUESTS_PER_SECOND, state=limiter_state, lock=limiter_lock
+    )
+    is_the_cookie_removed = False
+
+    # Loop para pegar informação de cada card.
+    for card_name in cards:
+        legible_card_name = card_name.replace(",", " ").replace("\n", "")
+        card_url = card_name.replace(" ", "+")
+        throttled_get(
+            driver, limiter, f"https://www.ligamagic.com.br/?view=cards/card&card={card_url}"
         )
-        continue
 
-    wait = WebDriverWait(driver, 10)
+        min_card_value, avg_card_value = wp.get_lm_min_avg_card_value(driver)
+        #min_card_value = wp.get_lm_card_value(driver, "MIN")
+        #avg_card_value = wp.get_lm_card_value(driver, "AVG")
 
-    if not is_the_cookie_removed:
-        # Clica no botão de banner pela primeira vez para aceitar os cookies..
-        try:
-            cookie_banner = wait.until(
-                EC.presence_of_element_located((By.ID, "lgpd-cookie"))
+        # Carta está mais cara do que estou disposto a pagar, então não procuro valores.
+        if min_card_value > MAXIMUM_CARD_PRICE:
+            cartas_web_df = get_card_dataframe(
+                legible_card_name, min_card_value, avg_card_value
+            )
+            logging.info(f"Carta {card_name} está muito cara! Está custando {min_card_value}")
+            cartas_web_df.to_csv(
+                output_file,
+                sep=";",
+                mode="a",
+                header=not os.path.exists(output_file),
+                index=False,
             )
-            close_cookie_button = cookie_banner.find_element(
-                By.TAG_NAME, "button"
+            continue
+
+        wait = WebDriverWait(driver, 10)
+
+        if not is_the_cookie_removed:
+            # Clica no botão de banner pela primeira vez para aceitar os cookies..
+            try:
+                cookie_banner = wait.until(
+                    EC.presence_of_element_located((By.ID, "lgpd-cookie"))
+                )
+                close_cookie_button = cookie_banner.find_element(
+                    By.TAG_NAME, "button"
+                )
+                close_cookie_button.click()
+                is_the_cookie_removed = True
+            except Exception as e:
+                pass
+
+        #TODO: PAREI AQUI. VER UMA FORMA MELHOR DE ESCREVER ESSE CODIGO
+        # Clica no botão VER MAIS nas cartas que possuem muitas ofertas.
+        try:
+            load_more_button = wait.until(
+                EC.element_to_be_clickable((By.ID, "marketplace-stores-loadmore"))
             )
-            close_cookie_button.click()
-            is_the_cookie_removed = True
+            load_more_button.click()
+            sleep(5)
         except Exception as e:
+            # Caso o botão não exista, não faz nada.
             pass
 
-    #TODO: PAREI AQUI. VER UMA FORMA MELHOR DE ESCREVER ESSE CODIGO
-    # Clica no botão VER MAIS nas cartas que possuem muitas ofertas.
-    try:
-        load_more_button = wait.until(
-            EC.element_to_be_clickable((By.ID, "marketplace-stores-loadmore"))
-        )
-        load_more_button.click()
-        sleep(5)
-    except Exception as e:
-        # Caso o botão não exista, não faz nada.
-        pass
-
-    marketplace_stores = driver.find_element(By.ID, "marketplace-stores")
-    stores = marketplace_stores.find_elements(By.CLASS_NAME, "store")
-
-    original_window = driver.current_window_handle
-    for count, store in enumerate(stores):
-        # driver.get(f"https://www.ligamagic.com.br/?view=cards/card&card={card_url}")
-
-        found_store_name = ""
-
-        card_quality = store.find_element(
-            By.XPATH,
-            f"/html/body/main/div[1]/div[7]/div[2]/div[4]/div[{count + 1}]/div[3]/div[1]/div[2]/div[2]",
-        ).text
-        card_quality = card_quality if card_quality != "" else "D"
-
-        card_quality_code = wp.get_card_quality(card_quality=card_quality)
-
-        card_language = store.find_element(
-            By.XPATH,
-            f"/html/body/main/div[1]/div[7]/div[2]/div[4]/div[{count + 1}]/div[3]/div[1]/div[2]/div[1]/img",
-        ).get_attribute("title").upper()
-        store_image = store.find_element(
-            By.XPATH,
-            f"/html/body/main/div[1]/div[7]/div[2]/div[4]/div[{count + 1}]/div[2]/div[1]/a/div/img",
-        )
-        store_code = int(re.search(r"(\d+)", store_image.get_attribute("data-src")).group(0))
-        
-        # Quando não há o código da loja. Método mais lento, pois visita pagina por pagina para achar o nome.
-        if user_stores["ligamagic_store_code"].count() == 0:
-            driver.execute_script(
-                f"window.open('https://www.ligamagic.com.br/?view=mp/showcase/home&id={store_code}', '_blank');"
+        marketplace_stores = driver.find_element(By.ID, "marketplace-stores")
+        stores = marketplace_stores.find_elements(By.CLASS_NAME, "store")
+
+        original_window = driver.current_window_handle
+        for count, store in enumerate(stores):
+            # driver.get(f"https://www.ligamagic.com.br/?view=cards/card&card={card_url}")
+
+            found_store_name = ""
+
+            card_quality = store.find_element(
+                By.XPATH,
+                f"/html/body/main/div[1]/div[7]/div[2]/div[4]/div[{count + 1}]/div[3]/div[1]/div[2]/div[2]",
+            ).text
+            card_quality = card_quality if card_quality != "" else "D"
+
+            card_quality_code = wp.get_card_quality(card_quality=card_quality)
+
+            card_language = store.find_element(
+                By.XPATH,
+                f"/html/body/main/div[1]/div[7]/div[2]/div[4]/div[{count + 1}]/div[3]/div[1]/div[2]/div[1]/img",
+            ).get_attribute("title").upper()
+            store_image = store.find_element(
+                By.XPATH,
+                f"/html/body/main/div[1]/div[7]/div[2]/div[4]/div[{count + 1}]/div[2]/div[1]/a/div/img",
             )
-            driver.switch_to.window(driver.window_handles[-1])
-            sleep(1)
-            store_name = driver.find_element(
-                By.CSS_SELECTOR, ".container-store-name .name div:first-child"
-            ).text.upper()
-            driver.close()
-            driver.switch_to.window(original_window)
-        else:
-            if not user_stores["ligamagic_store_code"].isin([store_code]).any():
-                store_name = '' 
-            else:
-                store_name = user_stores.loc[user_stores['ligamagic_store_code'] == store_code, 'name'].iloc[0]
-
-        if (
-            user_stores["name"].isin([store_name]).any()
-            #store_code in store_codes
-            and card_language in USER_ACCEPTED_LANGUAGES
-            and card_quality_code <= USER_CARD_QUALITY_CODE
-        ):
-            cheaper_cards_amount = count
-            found_card_quality = card_quality
-            found_store_name = store_name
-            break
-
-    # Bloco para pegar o preço da carta na loja achada
-    if found_store_name != "":  # não achou a carta
-
-        card_url = driver.find_element(
-            By.XPATH,
-            "/html/body/main/div[1]/div[3]/div[2]/div/div/div[2]/div[2]/div[1]/img",
-        ).get_attribute("class")
-
-        card_id = re.search(r"\d+", card_url).group()
-        store_url = user_stores[user_stores["name"] == found_store_name]["url"].values[
-            0
-        ]
-        store_url = f"{store_url}?view=ecom/item&tcg=1&card={card_id}"
-        discount = user_stores[user_stores["name"] == found_store_name][
-            "discount"
-        ].values[0]
-        store_discount = 0 if np.isnan(discount) else discount / 100
-        driver.get(store_url)
-
-        # TODO: arrumar isso
-        for i in range(10):
-            store_cards = driver.find_elements(By.CLASS_NAME, "table-cards-row")
-            if len(store_cards) == 0:
-                logging.warning("ELEMENTO NÃO ENCONTRADO EM table-cards-row!")
-                sleep(5)
+            store_code = int(re.search(r"(\d+)", store_image.get_attribute("data-src")).group(0))
+        
+            # Quando não há o código da loja. Método mais lento, pois visita pagina por pagina para achar o nome.
+            if user_stores["ligamagic_store_code"].count() == 0:
+                showcase_url = f"https://www.ligamagic.com.br/?view=mp/showcase/home&id={store_code}"
+                # Abre a vitrine numa nova aba pelo throttled_get, que também detecta páginas de bloqueio.
+                driver.switch_to.new_window("tab")
+                throttled_get(driver, limiter, showcase_url)
+                sleep(1)
+                store_name = driver.find_element(
+                    By.CSS_SELECTOR, ".container-store-name .name div:first-child"
+                ).text.upper()
+                driver.close()
+                driver.switch_to.window(original_window)
             else:
+                if not user_stores["ligamagic_store_code"].isin([store_code]).any():
+                    store_name = '' 
+                else:
+                    store_name = user_stores.loc[user_stores['ligamagic_store_code'] == store_code, 'name'].iloc[0]
+
+            if (
+                user_stores["name"].isin([store_name]).any()
+                #store_code in store_codes
+                and card_language in USER_ACCEPTED_LANGUAGES
+                and card_quality_code <= USER_CARD_QUALITY_CODE
+            ):
+                cheaper_cards_amount = count
+                found_card_quality = card_quality
+                found_store_name = store_name
                 break
 
-        if len(store_cards) == 0:
-            raise ValueError("Found no regs from %s" % store_url)
+        # Bloco para pegar o preço da carta na loja achada
+        if found_store_name != "":  # não achou a carta
+
+            card_url = driver.find_element(
+                By.XPATH,
+                "/html/body/main/div[1]/div[3]/div[2]/div/div/div[2]/div[2]/div[1]/img",
+            ).get_attribute("class")
+
+            card_id = re.search(r"\d+", card_url).group()
+            store_url = user_stores[user_stores["name"] == found_store_name]["url"].values[
+                0
+            ]
+            store_url = f"{store_url}?view=ecom/item&tcg=1&card={card_id}"
+            throttled_get(driver, limiter, store_url)
+
+            # TODO: arrumar isso
+            for i in range(10):
+                store_cards = driver.find_elements(By.CLASS_NAME, "table-cards-row")
+                if len(store_cards) == 0:
+                    logging.warning("ELEMENTO NÃO ENCONTRADO EM table-cards-row!")
+                    sleep(5)
+                else:
+                    break
 
-        final_card_price = float(
-            "inf"
-        )  # driver.find_elements(By.CSS_SELECTOR, "div.min > div.price")
+            if len(store_cards) == 0:
+                raise ValueError("Found no regs from %s" % store_url)
 
-        card_languages = driver.find_elements(
-            "xpath",
-            '//div[contains(@class, "table-cards-body-cell tooltip-item text-center")]//img',
-        )
+            final_card_price = float(
+                "inf"
+            )  # driver.find_elements(By.CSS_SELECTOR, "div.min > div.price")
+            total_cards = 0
+
+            card_languages = driver.find_elements(
+                "xpath",
+                '//div[contains(@class, "table-cards-body-cell tooltip-item text-center")]//img',
+            )
 
-        for i in range(len(card_languages)):
-            store_text = store_cards[i].text
-            card_language = card_languages[i].accessible_name.upper()
-            card_quality = wp.get_store_card_quality(store_text)
-            card_price = wp.get_store_card_price(store_text)
-            card_stock = wp.get_store_card_stock(store_text)
+            for i in range(len(card_languages)):
+                store_text = store_cards[i].text
+                card_language = card_languages[i].accessible_name.upper()
+                card_quality = wp.get_store_card_quality(store_text)
+                card_price = wp.get_store_card_price(store_text)
+                card_stock = wp.get_store_card_stock(store_text)
 
-            if (
-                card_price is not None
-                and card_language is not None
-                and card_quality is not None
-            ):
                 if (
-                    card_language in USER_ACCEPTED_LANGUAGES
-                    and card_quality_code
-                    <= wp.get_card_quality(card_quality=card_quality)
-                    and card_price <= final_card_price
-                    and card_stock > 0
+                    card_price is not None
+                    and card_language is not None
+                    and card_quality is not None
                 ):
-                    if card_price < final_card_price:
-                        total_cards = 0
-                    total_cards += card_stock
-                    final_card_price = card_price
-
-        cartas_web_df = get_card_dataframe(
-            legible_card_name,
-            min_card_value,
-            avg_card_value,
-            found_store_name,
-            found_card_quality,
-            total_cards,
-            cheaper_cards_amount,
-            final_card_price,
-            (final_card_price / min_card_value) - 1,
-            (final_card_price / avg_card_value) - 1,
+                    if (
+                        card_language in USER_ACCEPTED_LANGUAGES
+                        and card_quality_code
+                        <= wp.get_card_quality(card_quality=card_quality)
+                        and card_price <= final_card_price
+                        and card_stock > 0
+                    ):
+                        if card_price < final_card_price:
+                            total_cards = 0
+                        total_cards += card_stock
+                        final_card_price = card_price
+
+            cartas_web_df = get_card_dataframe(
+                legible_card_name,
+                min_card_value,
+                avg_card_value,
+                found_store_name,
+                found_card_quality,
+                total_cards,
+                cheaper_cards_amount,
+                final_card_price,
+            )
+            print("Salvando a carta", legible_card_name)
+        else:
+            cartas_web_df = get_card_dataframe(
+                legible_card_name, min_card_value, avg_card_value
+            )
+            print("Não achou a carta", card_name)
+        cartas_web_df.to_csv(
+            output_file,
+            sep=";",
+            mode="a",
+            header=not os.path.exists(output_file),
+            index=False,
         )
-        print("Salvando a carta", legible_card_name)
-    else:
-        cartas_web_df = get_card_dataframe(
-            legible_card_name, min_card_value, avg_card_value
+    driver.close()
+
+
+if __name__ == "__main__":
+    # Versões anteriores salvavam as cartas direto em cards.csv. Aproveita esse histórico
+    # como observações brutas em vez de sobrescrevê-lo com o novo relatório.
+    if not os.path.exists(RAW_OUTPUT_FILE) and os.path.exists(OUTPUT_FILE):
+        logging.info(f"Movendo {OUTPUT_FILE} para {RAW_OUTPUT_FILE}")
+        old_cards_df = pd.read_csv(OUTPUT_FILE, sep=";")
+        # Cartas antigas não têm scraped_at e ficam como as observações mais velhas.
+        old_cards_df.reindex(columns=get_card_dataframe("", 0, 0).columns).to_csv(
+            RAW_OUTPUT_FILE, sep=";", index=False
         )
-        print("Não achou a carta", card_name)
-    cartas_web_df.to_csv(
-        OUTPUT_FILE,
-        sep=";",
-        mode="a",
-        header=not os.path.exists(OUTPUT_FILE),
-        index=False,
-    )
-driver.close()
+        os.remove(OUTPUT_FILE)
+
+    cards = get_cards(INPUTS + "cardlist.txt")
+    if NUM_SHARDS > 1:
+        run_shards(scrape_cards, cards, NUM_SHARDS, RAW_OUTPUT_FILE)
+    else:
+        scrape_cards(cards, RAW_OUTPUT_FILE)
+    build_report(RAW_OUTPUT_FILE, user_stores, OUTPUT_FILE, STORES_SUMMARY_FILE)
@@ -0,0 +1,19 @@
+import os
+import logging
+import pandas as pd
+from liga_magic.analytics import build_report
+from liga_magic.paths import INPUTS, RAW_OUTPUT_FILE, OUTPUT_FILE, STORES_SUMMARY_FILE
+
+
+logging.basicConfig(level=logging.INFO)
+
+# Recalcula os relatórios a partir das observações já extraídas, sem rodar o scrapper de novo.
+if __name__ == "__main__":
+    if not os.path.exists(RAW_OUTPUT_FILE):
+        logging.error(
+            f"Arquivo {RAW_OUTPUT_FILE} não encontrado. Rode o scrapper com `python main.py` antes de gerar os relatórios."
+        )
+    else:
+        user_stores = pd.read_csv(INPUTS + "stores.csv", sep=";")
+        build_report(RAW_OUTPUT_FILE, user_stores, OUTPUT_FILE, STORES_SUMMARY_FILE)
+        logging.info(f"Relatórios salvos em {OUTPUT_FILE} e {STORES_SUMMARY_FILE}")
@@ -0,0 +1,99 @@
+import numpy as np
+import pandas as pd
+from liga_magic.analytics import (
+    compute_card_metrics,
+    get_store_summary,
+    get_latest_observations,
+    build_report,
+)
+
+
+def get_cards_df():
+    return pd.DataFrame(
+        {
+            "card_name": ["Demonic Tutor", "Sol Ring", "Brainstorm", "Counterspell", "Pinnacle Monk"],
+            "store_name": ["VAULT", "VAULT", "UGCardShop", None, "UGCardShop"],
+            "card_quality": ["NM", "SP", "NM", None, "NM"],
+            "stock": [1, 2, 4, 0, 1],
+            "cheaper_cards_amount": [3, 0, 1, 0, 2],
+            "min_value": [100.0, 10.0, 1.0, 2.0, float("inf")],
+            "avg_value": [200.0, 20.0, 0.0, 3.0, float("inf")],
+            "store_value": [150.0, 5.0, float("inf"), 0.0, 3.0],
+        }
+    )
+
+
+def get_stores_df():
+    return pd.DataFrame({"name": ["Vault", "UGCardShop"], "discount": [10, np.nan]})
+
+
+def test_compute_card_metrics():
+    cards_df = compute_card_metrics(get_cards_df(), get_stores_df())
+
+    assert cards_df["store_discount"].tolist() == [0.1, 0.1, 0, 0, 0]
+    assert cards_df["discounted_store_value"].iloc[0] == 135
+    assert cards_df["premium_discount_on_min_value"].iloc[0] == 0.5
+    assert cards_df["premium_discount_on_avg_value"].iloc[0] == -0.25
+    assert cards_df["discounted_premium_on_min_value"].iloc[1] == -0.55
+    assert cards_df["premium_rank"].tolist()[:2] == [2, 1]
+
+
+def test_compute_card_metrics_handles_missing_values():
+    cards_df = compute_card_metrics(get_cards_df(), get_stores_df())
+    metrics = cards_df[["premium_discount_on_min_value", "premium_discount_on_avg_value"]]
+
+    assert not np.isinf(metrics.to_numpy()).any()
+    # Sem oferta válida na loja, sem loja e sem preço na Liga Magic.
+    assert metrics.iloc[2:].isna().all().all()
+    assert cards_df["premium_rank"].iloc[2:].isna().all()
+
+
+def test_get_store_summary():
+    summary_df = get_store_summary(compute_card_metrics(get_cards_df(), get_stores_df()))
+
+    assert summary_df["store_name"].tolist() == ["VAULT", "UGCardShop"]
+    assert summary_df["cards_found"].tolist() == [2, 1]
+    assert summary_df["total_stock"].tolist() == [3, 1]
+    assert summary_df["total_store_value"].tolist() == [155, 3]
+
+
+def test_compute_card_metrics_without_cards_found():
+    cards_df = get_cards_df().assign(store_name=np.nan, store_value=0.0)
+    cards_df = compute_card_metrics(cards_df, get_stores_df())
+
+    assert cards_df["store_discount"].tolist() == [0, 0, 0, 0, 0]
+    assert cards_df["premium_discount_on_min_value"].isna().all()
+    assert len(get_store_summary(cards_df)) == 0
+
+
+def get_two_runs_df():
+    first_run_df = get_cards_df().iloc[:2].assign(scraped_at="2026-10-18T03:00:00")
+    second_run_df = get_cards_df().iloc[:2].assign(
+        scraped_at="2026-10-19T03:00:00", store_value=[120.0, 15.0], stock=[5, 6]
+    )
+    return pd.concat([first_run_df, second_run_df], ignore_index=True)
+
+
+def test_get_latest_observations():
+    legacy_df = get_cards_df().iloc[:1].assign(store_value=999.0)
+    cards_df = get_latest_observations(pd.concat([legacy_df, get_two_runs_df()], ignore_index=True))
+
+    assert cards_df["card_name"].tolist() == ["Demonic Tutor", "Sol Ring"]
+    assert cards_df["store_value"].tolist() == [120, 15]
+
+
+def test_build_report_uses_latest_run(tmp_path):
+    raw_file = str(tmp_path / "raw_cards.csv")
+    output_file = str(tmp_path / "cards.csv")
+    summary_file = str(tmp_path / "stores_summary.csv")
+    get_two_runs_df().to_csv(raw_file, sep=";", index=False)
+
+    build_report(raw_file, get_stores_df(), output_file, summary_file)
+
+    cards_df = pd.read_csv(output_file, sep=";")
+    assert cards_df["card_name"].tolist() == ["Demonic Tutor", "Sol Ring"]
+    assert cards_df["premium_rank"].tolist() == [1, 2]
+    summary_df = pd.read_csv(summary_file, sep=";")
+    assert summary_df["cards_found"].tolist() == [2]
+    assert summary_df["total_stock"].tolist() == [11]
+    assert summary_df["total_store_value"].tolist() == [135]
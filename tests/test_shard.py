@@ -0,0 +1,67 @@
+import os
+from time import sleep
+import pandas as pd
+import pytest
+from liga_magic.shard import split_cards, get_part_file, merge_part_files, run_shards
+
+
+def scrape_or_fail(cards, part_file, limiter_state, limiter_lock):
+    failed_marker = os.path.join(os.path.dirname(part_file), "failed")
+    if "Demonic Tutor" in cards:
+        # Salva parte das cartas antes de falhar, como um shard interrompido no meio.
+        pd.DataFrame({"card_name": cards[:1]}).to_csv(part_file, sep=";", index=False)
+        with limiter_lock:
+            limiter_state["www.ligamagic.com.br"] = "penalizado"
+        open(failed_marker, "w").close()
+        raise ValueError("Falha no shard")
+    # Só escreve depois que o outro shard falhou, como um shard que ainda está rodando.
+    while not os.path.exists(failed_marker):
+        sleep(0.01)
+    # O estado do limitador é compartilhado entre os shards.
+    assert limiter_state["www.ligamagic.com.br"] == "penalizado"
+    pd.DataFrame({"card_name": cards}).to_csv(part_file, sep=";", index=False)
+
+
+def test_split_cards():
+    cards = ["Demonic Tutor", "Pinnacle Monk", "Sol Ring", "Counterspell", "Brainstorm"]
+    assert split_cards(cards, 2) == [
+        ["Demonic Tutor", "Sol Ring", "Brainstorm"],
+        ["Pinnacle Monk", "Counterspell"],
+    ]
+    assert split_cards(cards, 2) == split_cards(cards, 2)
+    assert split_cards(cards, 1) == [cards]
+    assert len(split_cards(cards, 10)) == 5
+
+
+def test_split_cards_invalid_num_shards():
+    with pytest.raises(ValueError):
+        split_cards(["Sol Ring"], 0)
+
+
+def test_get_part_file():
+    assert get_part_file("assets/outputs/cards.csv", 3) == "assets/outputs/cards.part3.csv"
+
+
+def test_merge_part_files(tmp_path):
+    output_file = str(tmp_path / "cards.csv")
+    pd.DataFrame({"card_name": ["Sol Ring"]}).to_csv(output_file, sep=";", index=False)
+    part_files = [get_part_file(output_file, shard) for shard in range(3)]
+    pd.DataFrame({"card_name": ["Demonic Tutor"]}).to_csv(part_files[0], sep=";", index=False)
+    pd.DataFrame({"card_name": ["Brainstorm"]}).to_csv(part_files[2], sep=";", index=False)
+
+    merge_part_files(part_files, output_file)
+
+    cards_df = pd.read_csv(output_file, sep=";")
+    assert cards_df["card_name"].tolist() == ["Sol Ring", "Demonic Tutor", "Brainstorm"]
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["cards.csv"]
+
+
+def test_run_shards_keeps_cards_when_a_shard_fails(tmp_path):
+    output_file = str(tmp_path / "raw_cards.csv")
+
+    with pytest.raises(ValueError):
+        run_shards(scrape_or_fail, ["Demonic Tutor", "Sol Ring", "Brainstorm", "Counterspell"], 2, output_file)
+
+    cards_df = pd.read_csv(output_file, sep=";")
+    assert cards_df["card_name"].tolist() == ["Demonic Tutor", "Sol Ring", "Counterspell"]
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["failed", "raw_cards.csv"]
@@ -0,0 +1,132 @@
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import Manager
+from unittest.mock import MagicMock
+import pytest
+from liga_magic.throttle import TokenBucket, HostRateLimiter, is_blocked_page, throttled_get
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+def report_blocked_page(state, lock):
+    HostRateLimiter(4, state=state, lock=lock).report("https://www.ligamagic.com.br/", 1, blocked=True)
+
+
+def test_token_bucket_respects_rate():
+    clock = FakeClock()
+    bucket = TokenBucket(2, clock=clock, sleep=clock.sleep)
+    for _ in range(5):
+        bucket.acquire()
+    assert clock.now == pytest.approx(2)
+
+
+def test_token_bucket_invalid_rate():
+    with pytest.raises(ValueError):
+        TokenBucket(0)
+
+
+def test_token_bucket_adapts_rate():
+    clock = FakeClock()
+    bucket = TokenBucket(4, min_rate=1, increase=1, clock=clock, sleep=clock.sleep)
+    bucket.penalize()
+    assert bucket.rate == 2
+    bucket.penalize()
+    bucket.penalize()
+    assert bucket.rate == 1
+    bucket.reward()
+    assert bucket.rate == 2
+    for _ in range(5):
+        bucket.reward()
+    assert bucket.rate == 4
+
+
+def test_token_bucket_pause():
+    clock = FakeClock()
+    bucket = TokenBucket(4, clock=clock, sleep=clock.sleep)
+    bucket.penalize(pause=30)
+    bucket.acquire()
+    assert clock.now >= 30
+
+
+def test_host_rate_limiter_buckets_per_host():
+    limiter = HostRateLimiter(1)
+    lm_bucket = limiter.get_bucket("https://www.ligamagic.com.br/?view=cards/card&card=Sol+Ring")
+    assert lm_bucket is limiter.get_bucket("https://www.ligamagic.com.br/?view=mp/showcase/home&id=1")
+    assert lm_bucket is not limiter.get_bucket("https://www.vaultofcards.com.br/?view=ecom/item")
+
+
+def test_host_rate_limiter_report():
+    clock = FakeClock()
+    limiter = HostRateLimiter(4, slow_response=10, clock=clock, sleep=clock.sleep)
+    url = "https://www.ligamagic.com.br/"
+    limiter.report(url, 20)
+    assert limiter.get_bucket(url).rate == 2
+    limiter.report(url, 1)
+    assert limiter.get_bucket(url).rate > 2
+    limiter.report(url, 1, blocked=True)
+    assert limiter.get_bucket(url).paused_until == 30
+
+
+def test_is_blocked_page():
+    assert is_blocked_page("Just a moment...")
+    assert is_blocked_page("429 Too Many Requests")
+    assert not is_blocked_page("Sol Ring - Liga Magic")
+    assert not is_blocked_page("Sol Ring #429 - Loja")
+    assert not is_blocked_page(None)
+
+
+def test_throttled_get_retries_blocked_page():
+    clock = FakeClock()
+    limiter = HostRateLimiter(1, blocked_pause=5, clock=clock, sleep=clock.sleep)
+    mock_driver = MagicMock()
+    titles = iter(["Just a moment...", "Sol Ring - Liga Magic"])
+    mock_driver.get.side_effect = lambda url: setattr(mock_driver, "title", next(titles))
+
+    throttled_get(mock_driver, limiter, "https://www.ligamagic.com.br/")
+
+    assert mock_driver.get.call_count == 2
+    assert clock.now >= 5
+
+
+def test_throttled_get_raises_when_always_blocked():
+    clock = FakeClock()
+    limiter = HostRateLimiter(1, blocked_pause=5, clock=clock, sleep=clock.sleep)
+    mock_driver = MagicMock(title="Just a moment...")
+
+    with pytest.raises(ValueError):
+        throttled_get(mock_driver, limiter, "https://www.ligamagic.com.br/", max_retries=2)
+
+    assert mock_driver.get.call_count == 3
+
+
+def test_host_rate_limiter_shares_state():
+    clock = FakeClock()
+    state = {}
+    lock = threading.Lock()
+    first = HostRateLimiter(4, state=state, lock=lock, clock=clock, sleep=clock.sleep)
+    second = HostRateLimiter(4, state=state, lock=lock, clock=clock, sleep=clock.sleep)
+    url = "https://www.ligamagic.com.br/"
+    first.report(url, 1, blocked=True)
+    assert second.get_bucket(url).rate == 2
+    assert second.get_bucket(url).paused_until == 30
+
+
+def test_host_rate_limiter_shares_state_between_processes():
+    with Manager() as manager:
+        state = manager.dict()
+        lock = manager.Lock()
+        with ProcessPoolExecutor(max_workers=1) as executor:
+            executor.submit(report_blocked_page, state, lock).result()
+        limiter = HostRateLimiter(4, state=state, lock=lock)
+        assert limiter.get_bucket("https://www.ligamagic.com.br/").rate == 2